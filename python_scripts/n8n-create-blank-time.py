@@ -1,13 +1,209 @@
 # code for n8n Python Code node
 # creates an empty audio file with specified duration and parameters
 
-import ffmpy
+import functools
+import math
 import os
+import re
+import shutil
+import stat
+import struct
 import subprocess
+import tempfile
 import time
+from dataclasses import dataclass
+
+# Function to resolve the ffmpeg binary once per process, only when first needed
+@functools.lru_cache(maxsize=1)
+def get_ffmpeg_path():
+    # Prefer the binary configured by post-deployment.sh
+    for variable in ('FFMPEG_BINARY', 'IMAGEIO_FFMPEG_EXE'):
+        path = os.environ.get(variable)
+        if path and os.path.isfile(path):
+            return path
+    return shutil.which('ffmpeg') or 'ffmpeg'
+
+# Per-user directory where the 1-second silent MP3 clips are cached between runs
+SILENCE_CACHE_DIR = os.path.join(tempfile.gettempdir(), f'n8n-silence-{os.getuid()}')
+
+# Parameters for one silent audio file, with the node's defaults
+@dataclass(slots=True)
+class AudioParams:
+    duration: float = 10.0
+    sample_rate: int = 44100
+    bitrate: str = '192k'
+    channels: int = 2
+    output_format: str = 'mp3'
+    output_path: str = '.'
+    filename: str = 'empty_audio'
+
+# Item key read for each AudioParams field
+ITEM_KEYS = {
+    'duration': 'audio_duration',
+    'sample_rate': 'audio_sampling_rate',
+    'bitrate': 'audio_bitrate',
+    'channels': 'audio_channels',
+    'output_format': 'audio_file_format',
+    'output_path': 'audio_files_path',
+    'filename': 'audio_file_name'
+}
+
+# Function to parse an n8n item into AudioParams
+def parse_params(item):
+    params = AudioParams(**{field: item[key] for field, key in ITEM_KEYS.items() if key in item})
+    params.duration = float(params.duration)
+    params.sample_rate = int(params.sample_rate)
+    params.channels = int(params.channels)
+    return params
 
 results = []
 
+# Function to write a silent 16-bit PCM WAV file without invoking ffmpeg
+def write_silent_wav(output_file, duration, sample_rate, channels):
+    sample_width = 2
+    block_align = channels * sample_width
+    data_size = int(duration * sample_rate) * block_align
+    
+    # The RIFF size fields are unsigned 32-bit and include the rest of the header
+    if not 0 <= data_size <= 0xFFFFFFFF - 36:
+        raise ValueError(f"WAV data size out of range: {data_size} bytes")
+    
+    # Canonical 44-byte RIFF/WAVE header
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size
+    )
+    
+    with open(output_file, 'wb') as f:
+        f.write(header)
+        f.flush()
+        # Silence is all zero bytes, so extend the file instead of writing them
+        if data_size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), len(header), data_size)
+                return
+            except OSError:
+                # e.g. EOPNOTSUPP on musl for filesystems without fallocate
+                pass
+        f.truncate(len(header) + data_size)
+
+# Function to run an ffmpeg command, returning an error message on failure
+def run_ffmpeg(argv):
+    try:
+        subprocess.run(
+            argv,
+            check=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        return None
+    except subprocess.CalledProcessError as e:
+        return e.stderr.decode('utf-8', errors='replace').strip() or str(e)
+
+# Function to get a cached 1-second silent MP3, encoding it on first use
+def get_silence_clip(sample_rate, bitrate, channels):
+    # The parameters become part of the cache file name, so only accept plain
+    # numbers (bitrate optionally suffixed with k) to keep it inside the cache
+    if not (re.fullmatch(r'\d+[kK]?', str(bitrate))
+            and str(sample_rate).isdigit() and str(channels).isdigit()):
+        return None, f"Unsupported parameters for the silence cache: {sample_rate}, {bitrate}, {channels}"
+    
+    silence_file = os.path.join(
+        SILENCE_CACHE_DIR, f"silence_{sample_rate}_{bitrate}_{channels}.mp3"
+    )
+    partial_file = None
+    try:
+        # Clips are read with '-safe 0', so only trust a private directory we own
+        os.makedirs(SILENCE_CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(SILENCE_CACHE_DIR)
+        if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+                or info.st_mode & 0o077):
+            return None, f"Untrusted silence cache directory: {SILENCE_CACHE_DIR}"
+        
+        if os.path.isfile(silence_file):
+            return silence_file, None
+        
+        channel_layout = 'stereo' if channels == 2 else 'mono'
+        
+        # Encode to a unique name and rename, so concurrent runs never see a partial clip
+        fd, partial_file = tempfile.mkstemp(suffix='.mp3', dir=SILENCE_CACHE_DIR)
+        os.close(fd)
+        error = run_ffmpeg([
+            get_ffmpeg_path(), '-y', '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi',
+            '-t', '1',
+            '-i', f'anullsrc=r={sample_rate}:cl={channel_layout}',
+            '-ar', str(sample_rate),
+            '-ab', bitrate,
+            '-ac', str(channels),
+            '-write_xing', '0',
+            '-threads', '1',
+            partial_file
+        ])
+        if error is not None:
+            return None, error
+        os.replace(partial_file, silence_file)
+        partial_file = None
+        return silence_file, None
+    except OSError as e:
+        return None, str(e)
+    finally:
+        if partial_file is not None:
+            remove_files([partial_file])
+
+# Function to write a concat demuxer list repeating a clip to cover the duration
+def write_concat_list(clip_file, duration):
+    fd, list_file = tempfile.mkstemp(suffix='.txt', dir=SILENCE_CACHE_DIR)
+    entry = "file '{}'\n".format(clip_file.replace("'", "'\\''"))
+    with os.fdopen(fd, 'w') as f:
+        f.write(entry * max(1, math.ceil(duration)))
+    return list_file
+
+# Function to build the ffmpeg input and output arguments for one silent clip
+# Concat list files created along the way are appended to temp_files
+def silent_audio_args(duration, sample_rate, bitrate, channels, output_format, temp_files):
+    # MP3 silence is repeated identical frames, so stream-copy a cached
+    # 1-second clip instead of running the encoder for the whole duration
+    if output_format.lower() == 'mp3':
+        silence_file, error = get_silence_clip(sample_rate, bitrate, channels)
+        if error is None:
+            try:
+                list_file = write_concat_list(silence_file, duration)
+            except OSError:
+                list_file = None
+            if list_file is not None:
+                temp_files.append(list_file)
+                input_args = ['-f', 'concat', '-safe', '0', '-t', str(duration), '-i', list_file]
+                return input_args, ['-c', 'copy']
+    
+    # Note: 'anullsrc=r={sample_rate}:cl=stereo' needs to match channel count
+    channel_layout = 'stereo' if channels == 2 else 'mono'
+    
+    input_args = [
+        '-f', 'lavfi',
+        '-t', str(duration),
+        '-i', f'anullsrc=r={sample_rate}:cl={channel_layout}'
+    ]
+    output_args = [
+        '-ar', str(sample_rate),  # Sample rate
+        '-ab', bitrate,           # Bitrate
+        '-ac', str(channels),     # Number of channels
+        '-threads', '1'           # Silence needs no encoder worker threads
+    ]
+    return input_args, output_args
+
+# Function to remove temporary files, ignoring ones already gone
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 # Function to create empty audio
 def create_empty_audio_file(
     duration,
@@ -19,70 +215,172 @@ def create_empty_audio_file(
     filename='empty_audio'
 ):
     # Ensure output directory exists
-    os.makedirs(output_path, exist_ok=True)
+    try:
+        os.makedirs(output_path, exist_ok=True)
+    except OSError as e:
+        return None, str(e)
     
     # Construct output filename
     output_file = os.path.join(output_path, f"{filename}.{output_format}")
     
-    # Correct ffmpy command for generating silent audio
-    # Note: 'anullsrc=r={sample_rate}:cl=stereo' needs to match channel count
-    channel_layout = 'stereo' if channels == 2 else 'mono'
+    # WAV silence is just a header plus zeroed PCM, no need to spawn ffmpeg
+    if output_format.lower() == 'wav':
+        try:
+            write_silent_wav(output_file, duration, sample_rate, channels)
+            return output_file, None
+        except (OSError, ValueError, struct.error) as e:
+            return None, str(e)
     
-    ff = ffmpy.FFmpeg(
-        global_options=['-y'],  # Global option to overwrite files
-        inputs={
-            f'anullsrc=r={sample_rate}:cl={channel_layout}': ['-f', 'lavfi', '-t', str(duration)]
-        },
-        outputs={
-            output_file: [
-                '-ar', str(sample_rate),  # Sample rate
-                '-ab', bitrate,          # Bitrate
-                '-ac', str(channels)     # Number of channels
-            ]
-        }
-    )
-    
-    # Run the command and capture output
+    temp_files = []
     try:
-        ff.run(stderr=subprocess.PIPE)
+        input_args, output_args = silent_audio_args(
+            duration, sample_rate, bitrate, channels, output_format, temp_files
+        )
+        
+        # Build the ffmpeg command for generating silent audio
+        argv = [
+            get_ffmpeg_path(),
+            '-y',                     # Overwrite existing files
+            '-nostdin',
+            '-hide_banner',
+            '-loglevel', 'error',
+            *input_args,
+            *output_args,
+            output_file
+        ]
+        
+        # Run the command and capture output
+        error = run_ffmpeg(argv)
+    except OSError as e:
+        error = str(e)
+    finally:
+        remove_files(temp_files)
+    
+    if error is None:
         return output_file, None
-    except ffmpy.FFRuntimeError as e:
-        return None, str(e)
+    return None, error
+
+# Function to create an empty audio file from AudioParams
+def create_empty_audio_file_from_params(params):
+    return create_empty_audio_file(
+        duration=params.duration,
+        sample_rate=params.sample_rate,
+        bitrate=params.bitrate,
+        channels=params.channels,
+        output_format=params.output_format,
+        output_path=params.output_path,
+        filename=params.filename
+    )
+
+# Function to create several empty audio files with a single ffmpeg process
+def create_empty_audio_files(jobs):
+    # Each job is an AudioParams
+    outcomes = [None] * len(jobs)
+    
+    argv = [get_ffmpeg_path(), '-y', '-nostdin', '-hide_banner', '-loglevel', 'error']
+    output_args = []
+    batched = []
+    
+    # Clips with identical parameters are generated once and copied
+    generated = {}
+    copies = []
+    
+    for index, job in enumerate(jobs):
+        output_format = job.output_format
+        
+        # WAV files are written directly and never need ffmpeg
+        if output_format.lower() == 'wav':
+            outcomes[index] = create_empty_audio_file_from_params(job)
+            continue
+        
+        sample_rate = job.sample_rate
+        bitrate = job.bitrate
+        channels = job.channels
+        
+        # A bad output directory only fails this item, not the whole batch
+        try:
+            os.makedirs(job.output_path, exist_ok=True)
+        except OSError as e:
+            outcomes[index] = (None, str(e))
+            continue
+        output_file = os.path.join(job.output_path, f"{job.filename}.{output_format}")
+        
+        signature = (output_format.lower(), job.duration, sample_rate, bitrate, channels)
+        if signature in generated:
+            copies.append((index, output_file, generated[signature]))
+            continue
+        generated[signature] = index
+        batched.append((index, output_file))
+    
+    if len(batched) == 1:
+        index, _ = batched[0]
+        outcomes[index] = create_empty_audio_file_from_params(jobs[index])
+    elif batched:
+        temp_files = []
+        prepared = []
+        try:
+            # One input per clip, mapped to its own output
+            for index, output_file in batched:
+                job = jobs[index]
+                input_args, clip_output_args = silent_audio_args(
+                    job.duration, job.sample_rate, job.bitrate, job.channels,
+                    job.output_format, temp_files
+                )
+                argv += input_args
+                output_args += ['-map', f'{len(prepared)}:a', *clip_output_args, output_file]
+                prepared.append((index, output_file))
+            
+            # ffmpeg failing to start (missing binary, EACCES, E2BIG on a large
+            # batch) falls back to one process per file like any other failure
+            try:
+                error = run_ffmpeg(argv + output_args) if prepared else None
+            except OSError as e:
+                error = str(e)
+        finally:
+            remove_files(temp_files)
+        
+        if error is None:
+            for index, output_file in prepared:
+                outcomes[index] = (output_file, None)
+        else:
+            # Fall back to one process per file so each item gets its own error
+            for index, _ in prepared:
+                outcomes[index] = create_empty_audio_file_from_params(jobs[index])
+    
+    # Reuse the file generated for each duplicate signature
+    for index, output_file, source_index in copies:
+        source_file, error = outcomes[source_index]
+        if error is not None:
+            outcomes[index] = (None, error)
+            continue
+        try:
+            if os.path.abspath(source_file) != os.path.abspath(output_file):
+                shutil.copyfile(source_file, output_file)
+            outcomes[index] = (output_file, None)
+        except OSError as e:
+            outcomes[index] = (None, str(e))
+    
+    return outcomes
 
 # Main code for n8n
 try:
-    # Get parameters from the first item
-    item = items[0]
-    
-    # Extract parameters
-    duration = float(item.get('audio_duration', 10))
-    sample_rate = int(item.get('audio_sampling_rate', 44100))
-    bitrate = item.get('audio_bitrate', '192k')
-    channels = int(item.get('audio_channels', 2))
-    output_format = item.get('audio_file_format', 'mp3')
-    output_path = item.get('audio_files_path', '.')
-    filename = item.get('audio_file_name', 'empty_audio')
-    
-    # Create the audio file
-    output_file, error = create_empty_audio_file(
-        duration=duration,
-        sample_rate=sample_rate,
-        bitrate=bitrate,
-        channels=channels,
-        output_format=output_format,
-        output_path=output_path,
-        filename=filename
-    )
+    # Extract parameters from every item
+    jobs = [parse_params(item) for item in items]
     
-    # Update the item with results
-    if error is None:
-        item['audio_output_status'] = 'success'
-        item['audio_output_file'] = output_file
-    else:
-        item['audio_output_status'] = 'error'
-        item['audio_output_error'] = error
+    # Create all audio files in one pass
+    outcomes = create_empty_audio_files(jobs)
+    
+    # Update each item with its results
+    for item, (output_file, error) in zip(items, outcomes):
+        if error is None:
+            item['audio_output_status'] = 'success'
+            item['audio_output_file'] = output_file
+        else:
+            item['audio_output_status'] = 'error'
+            item['audio_output_error'] = error
+        
+        results.append(item)
     
-    results.append(item)
     return results
     
 except Exception as e:
@@ -1,112 +1,237 @@
 import json
+import multiprocessing
 import os
-from pptx import Presentation
+import posixpath
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from lxml import etree
 
-# Get input data from items collection
-items = $input.all()
-results = []
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Process each item in the collection
-for item in items:
+# XML namespaces used by PowerPoint package parts
+NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+NS_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+NS_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
 
-    # Get file path from the current item
-    file_path = item.json.get("file_path", "")
-    
-    if not file_path or not os.path.isfile(file_path):
-        results.append({
-            "success": False,
-            "error": f"Invalid file path: {file_path}",
-            "file_path": file_path
-        })
-        continue
+# Relationship types
+RT_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+RT_NOTES_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+def read_relationships(package, part_name):
+    """Map the relationship ids of a part to their type and target part name"""
+    directory, base_name = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, "_rels", base_name + ".rels")
+    relationships = {}
+    try:
+        rels_file = package.open(rels_name)
+    except KeyError:
+        return relationships
+    with rels_file:
+        for _, rel in etree.iterparse(rels_file, tag=f"{NS_REL}Relationship"):
+            target = rel.get("Target")
+            if rel.get("TargetMode") != "External":
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(directory, target))
+            relationships[rel.get("Id")] = (rel.get("Type"), target)
+            rel.clear()
+    return relationships
+
+def read_slide_list(package):
+    """List (slide_id, part_name) for each slide in presentation order"""
+    presentation_part = next(
+        target for rel_type, target in read_relationships(package, "").values()
+        if rel_type == RT_OFFICE_DOCUMENT
+    )
+    relationships = read_relationships(package, presentation_part)
+    slides = []
+    with package.open(presentation_part) as presentation_file:
+        for _, sld_id in etree.iterparse(presentation_file, tag=f"{NS_P}sldId"):
+            _, part_name = relationships[sld_id.get(f"{NS_R}id")]
+            slides.append((sld_id.get("id"), part_name))
+    return slides
+
+def extract_text_from_paragraph(paragraph):
+    """Join the text of runs, fields and line breaks in a paragraph"""
+    parts = []
+    for child in paragraph:
+        if child.tag == f"{NS_A}br":
+            parts.append("\v")
+        elif child.tag in (f"{NS_A}r", f"{NS_A}fld"):
+            parts.append(child.findtext(f"{NS_A}t") or "")
+    return "".join(parts)
+
+def extract_text_from_text_body(text_body):
+    """Extract text from a text body, one line per paragraph"""
+    if text_body is None:
+        return ""
+    return "\n".join(
+        extract_text_from_paragraph(paragraph)
+        for paragraph in text_body.iterfind(f"{NS_A}p")
+    )
 
 def extract_text_from_shape(shape):
     """Extract text from a shape if it has a text frame"""
-    if hasattr(shape, 'text'):
-        return shape.text
-    return ""
+    return extract_text_from_text_body(shape.find(f"{NS_P}txBody"))
 
 def extract_text_from_table(table):
     """Extract text from tables in the slide"""
     table_data = []
-    for row in table.rows:
+    for row in table.iterfind(f"{NS_A}tr"):
         row_data = []
-        for cell in row.cells:
-            if cell.text:
-                row_data.append(cell.text)
-            else:
-                row_data.append("")
+        for cell in row.iterfind(f"{NS_A}tc"):
+            row_data.append(extract_text_from_text_body(cell.find(f"{NS_A}txBody")))
         table_data.append(row_data)
     return table_data
 
-def extract_slide_content(slide, slide_index):
+def extract_notes_text(package, part_name):
+    """Extract the text of the body placeholder on a notes slide"""
+    with package.open(part_name) as notes_file:
+        for _, shape in etree.iterparse(notes_file, tag=f"{NS_P}sp"):
+            placeholder = shape.find(f"{NS_P}nvSpPr/{NS_P}nvPr/{NS_P}ph")
+            if placeholder is not None and placeholder.get("type") == "body":
+                return extract_text_from_shape(shape)
+    return ""
+
+def extract_slide_content(package, part_name, slide_id, slide_index):
     """Extract all text content from a slide"""
     slide_data = {
         "slide_number": slide_index + 1,
-        "slide_id": str(slide.slide_id),
+        "slide_id": slide_id,
         "shapes_text": [],
         "tables": [],
         "notes": ""
     }
     
-    # Extract text from shapes
-    for shape in slide.shapes:
-        if shape.has_text_frame:
-            text = shape.text.strip()
-            if text:
-                slide_data["shapes_text"].append(text)
-        elif shape.has_table:
-            table_data = extract_text_from_table(shape.table)
-            if table_data:
-                slide_data["tables"].append(table_data)
+    # Extract text from top-level shapes, streaming the slide XML
+    with package.open(part_name) as slide_file:
+        for _, shape in etree.iterparse(slide_file, tag=(f"{NS_P}sp", f"{NS_P}graphicFrame")):
+            # Shapes nested in groups are not part of the slide's own shapes
+            if shape.getparent().tag != f"{NS_P}spTree":
+                continue
+            if shape.tag == f"{NS_P}sp":
+                # Only strip text that is not empty or all whitespace
+                text = extract_text_from_shape(shape)
+                if text and not text.isspace():
+                    slide_data["shapes_text"].append(text.strip())
+            else:
+                table = shape.find(f"{NS_A}graphic/{NS_A}graphicData/{NS_A}tbl")
+                if table is not None:
+                    table_data = extract_text_from_table(table)
+                    if table_data:
+                        slide_data["tables"].append(table_data)
+            shape.clear()
     
     # Extract speaker notes
-    if hasattr(slide, 'notes_slide') and slide.notes_slide is not None:
-        notes_text = slide.notes_slide.notes_text_frame.text.strip()
-        if notes_text:
-            slide_data["notes"] = notes_text
+    for rel_type, target in read_relationships(package, part_name).values():
+        if rel_type == RT_NOTES_SLIDE:
+            notes_text = extract_notes_text(package, target)
+            if notes_text and not notes_text.isspace():
+                slide_data["notes"] = notes_text.strip()
+            break
     
     return slide_data
 
-    try:
-        # Load presentation
-        presentation = Presentation(file_path)
-        
-        # Get presentation metadata
-        presentation_data = {
-            "title": os.path.basename(file_path),
-            "slide_count": len(presentation.slides),
-            "slides": []
+def process_one(file_path, max_threads=None):
+    """Extract the content of a single presentation and write it to JSON"""
+    if not file_path or not os.path.isfile(file_path):
+        return {
+            "success": False,
+            "error": f"Invalid file path: {file_path}",
+            "file_path": file_path
         }
-        
-        # Extract content from each slide
-        for i, slide in enumerate(presentation.slides):
-            slide_data = extract_slide_content(slide, i)
-            presentation_data["slides"].append(slide_data)
+
+    try:
+        # Open the presentation package
+        with zipfile.ZipFile(file_path) as package:
+            slides = read_slide_list(package)
+            
+            # Get presentation metadata
+            presentation_data = {
+                "title": os.path.basename(file_path),
+                "slide_count": len(slides),
+                "slides": []
+            }
+            
+            # Extract content from the slides in parallel, lxml parses without the GIL
+            max_workers = max(1, min(len(slides), max_threads or os.cpu_count() or 1))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(extract_slide_content, package, part_name, slide_id, i)
+                    for i, (slide_id, part_name) in enumerate(slides)
+                ]
+                presentation_data["slides"] = [future.result() for future in futures]
         
         # Output file path (in same directory as input file)
         base_name = os.path.splitext(file_path)[0]
         output_path = f"{base_name}_content.json"
         
         # Write to JSON file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(presentation_data, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(presentation_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(presentation_data, f, ensure_ascii=False, indent=2)
         
-        # Add result for this item
-        results.append({
+        # Result for this item
+        return {
             "success": True,
             "file_path": file_path,
             "output_path": output_path,
             "slide_count": presentation_data["slide_count"],
             "data": presentation_data
-        })
+        }
 
     except Exception as e:
-        results.append({
+        return {
             "success": False,
             "error": str(e),
             "file_path": file_path
-        })
+        }
+
+# Get input data from items collection
+items = $input.all()
+results = []
+
+# Get file path from each item
+file_paths = [item.json.get("file_path", "") for item in items]
+
+# n8n runs this code inside a function, so process_one is a local object that
+# pickle cannot reference. Publishing it on the module the code runs in lets
+# forked workers, which inherit that module, resolve it when unpickling.
+module = sys.modules.get(process_one.__module__)
+
+# Only fork while this process is single-threaded: a thread of the runner
+# could hold a lock at fork time that the child would then never see released
+use_pool = (
+    len(file_paths) > 1
+    and module is not None
+    and threading.active_count() == 1
+)
+
+if use_pool:
+    # Process presentations in parallel, one worker per item up to the core count
+    process_one.__qualname__ = process_one.__name__
+    setattr(module, process_one.__name__, process_one)
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+    
+    # Share the cores between workers rather than giving each a full thread pool
+    max_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    mp_context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        results = list(executor.map(process_one, file_paths, [max_threads] * len(file_paths)))
+else:
+    # A single item, a module that cannot be found in sys.modules (so workers
+    # could not resolve process_one) or a multi-threaded runner: run serially
+    results = [process_one(file_path) for file_path in file_paths]
 
 # Return all results
 return results
\ No newline at end of file
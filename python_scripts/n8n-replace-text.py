@@ -3,7 +3,160 @@
 
 from pptx import Presentation
 from io import BytesIO
+from lxml import etree
 import os
+import re
+import zipfile
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# DrawingML and PresentationML element names
+NS_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+NS_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A_BR = f'{NS_A}br'
+A_FLD = f'{NS_A}fld'
+A_R = f'{NS_A}r'
+A_T = f'{NS_A}t'
+
+# Paragraphs of the slide's top-level text shapes, as python-pptx reports them
+PARAGRAPH_PATH = f'{NS_P}cSld/{NS_P}spTree/{NS_P}sp/{NS_P}txBody/{NS_A}p'
+
+# Slide parts inside the package
+SLIDE_PART = re.compile(r'ppt/slides/slide\d+\.xml$')
+
+# Function to compile the search terms into a single-pass matcher
+def build_matcher(rules):
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for search_text, replace_text in rules.items():
+            automaton.add_word(search_text, (len(search_text), replace_text))
+        automaton.make_automaton()
+        return automaton
+    
+    # Longest terms first so the alternation prefers the longest match
+    pattern = '|'.join(re.escape(search_text) for search_text in sorted(rules, key=len, reverse=True))
+    return re.compile(pattern)
+
+# Function to find non-overlapping (start, end, replacement) matches, leftmost-longest first
+def find_matches(matcher, rules, text):
+    if isinstance(matcher, re.Pattern):
+        return [(m.start(), m.end(), rules[m.group()]) for m in matcher.finditer(text)]
+    
+    candidates = sorted(
+        (end - length + 1, -length, replace_text)
+        for end, (length, replace_text) in matcher.iter(text)
+    )
+    matches = []
+    position = 0
+    for start, negative_length, replace_text in candidates:
+        if start >= position:
+            position = start - negative_length
+            matches.append((start, position, replace_text))
+    return matches
+
+# Function to splice the replacements into the text in one pass
+def apply_matches(text, matches):
+    parts = []
+    position = 0
+    for start, end, replace_text in matches:
+        parts.append(text[position:start])
+        parts.append(replace_text)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+# Function to replace text in the matching runs of a slide paragraph element
+# Returns False when a match only exists across several runs
+def replace_in_paragraph_element(paragraph, matcher, rules):
+    paragraph_text = ''.join(
+        '\v' if child.tag == A_BR else child.findtext(A_T) or ''
+        for child in paragraph
+        if child.tag in (A_R, A_FLD, A_BR)
+    )
+    if not find_matches(matcher, rules, paragraph_text):
+        return True
+    
+    replaced = False
+    for text_element in paragraph.iterfind(f'{A_R}/{A_T}'):
+        run_matches = find_matches(matcher, rules, text_element.text or '')
+        if run_matches:
+            text_element.text = apply_matches(text_element.text, run_matches)
+            replaced = True
+    return replaced
+
+# Function to copy the package part by part, rewriting only slides with matches
+# Returns False without writing anything when python-pptx is needed instead
+def replace_in_package(file_path, output_path, matcher, rules):
+    changed_parts = {}
+    
+    with zipfile.ZipFile(file_path) as source:
+        if matcher is not None:
+            for name in source.namelist():
+                if not SLIDE_PART.match(name):
+                    continue
+                
+                # Skip slides whose text does not contain any search term at all
+                slide = etree.fromstring(source.read(name))
+                slide_text = etree.tostring(slide, method='text', encoding='unicode')
+                if not find_matches(matcher, rules, slide_text):
+                    continue
+                
+                for paragraph in slide.iterfind(PARAGRAPH_PATH):
+                    if not replace_in_paragraph_element(paragraph, matcher, rules):
+                        return False
+                
+                changed_parts[name] = etree.tostring(
+                    slide, xml_declaration=True, encoding='UTF-8', standalone=True
+                )
+        
+        # Stream every part to the output, substituting the changed slides
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                data = changed_parts.get(info.filename)
+                target.writestr(info, data if data is not None else source.read(info))
+    
+    return True
+
+# Function to replace text through python-pptx, rewriting paragraphs where a
+# match spans several runs
+def replace_in_presentation(file_path, output_path, matcher, rules):
+    # Load the presentation from the file path
+    prs = Presentation(file_path)
+    
+    # Process each slide
+    for slide in prs.slides:
+        # Skip slides whose text does not contain any search term at all
+        slide_text = etree.tostring(slide.element, method='text', encoding='unicode')
+        if not find_matches(matcher, rules, slide_text):
+            continue
+        
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                text_frame = shape.text_frame
+                
+                for paragraph in text_frame.paragraphs:
+                    paragraph_text = paragraph.text
+                    paragraph_matches = find_matches(matcher, rules, paragraph_text)
+                    if not paragraph_matches:
+                        continue
+                    
+                    # Edit matching runs in place to keep their formatting
+                    replaced = False
+                    for run in paragraph.runs:
+                        run_matches = find_matches(matcher, rules, run.text)
+                        if run_matches:
+                            run.text = apply_matches(run.text, run_matches)
+                            replaced = True
+                    
+                    # Match spans several runs, rewrite the whole paragraph
+                    if not replaced:
+                        paragraph.text = apply_matches(paragraph_text, paragraph_matches)
+    
+    # Save the modified presentation
+    prs.save(output_path)
 
 new_items = []
 for item in items:
@@ -13,29 +166,27 @@ for item in items:
         
         # Check if file path is provided and file exists
         if file_path and os.path.exists(file_path):
-            # Get search and replace text (or use defaults if not provided)
-            search_text = item.get('searchText', 'OLD TEXT')
-            replace_text = item.get('replaceText', 'NEW TEXT')
-            
-            # Load the presentation from the file path
-            prs = Presentation(file_path)
-            
-            # Process each slide
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if shape.has_text_frame:
-                        text_frame = shape.text_frame
-                        
-                        for paragraph in text_frame.paragraphs:
-                            if search_text in paragraph.text:
-                                paragraph.text = paragraph.text.replace(search_text, replace_text)
+            # Get search and replace terms, either as a 'replacements' mapping
+            # (or list of searchText/replaceText objects) or a single pair
+            replacements = item.get('replacements')
+            if replacements is None:
+                rules = {item.get('searchText', 'OLD TEXT'): item.get('replaceText', 'NEW TEXT')}
+            elif isinstance(replacements, dict):
+                rules = dict(replacements)
+            else:
+                rules = {rule['searchText']: rule['replaceText'] for rule in replacements}
+            rules = {search_text: str(replace_text) for search_text, replace_text in rules.items() if search_text}
             
             # Create output filename
             file_name = os.path.basename(file_path)
             output_path = os.path.join(os.path.dirname(file_path), f"modified_{file_name}")
             
-            # Save the modified presentation
-            prs.save(output_path)
+            # Compile all search terms once per presentation
+            matcher = build_matcher(rules) if rules else None
+            
+            # Rewrite only the changed slide parts, unless a match spans several runs
+            if not replace_in_package(file_path, output_path, matcher, rules):
+                replace_in_presentation(file_path, output_path, matcher, rules)
             
             # Update item with results
             item['status'] = 'Text replaced successfully'